@@ -0,0 +1,261 @@
+#  Copyright (c) 2017-2020 Wenyi Tang.
+#  Author: Wenyi Tang
+#  Email: wenyitang@outlook.com
+#  Update: 2026 - 10 - 15
+
+import copy
+import io
+import os
+import shutil
+
+if not os.getcwd().endswith('Tests'):
+  os.chdir('Tests')
+import pytest
+import torch
+
+from VSR.Backend.Torch.Models import Arch
+from VSR.Backend.Torch.Models.Arch import (
+  CascadeRdn, EasyConv2d, Rcab, Rdb, SpaceToBatch, SpaceToDepth, SpaceToDim,
+  Upsample,
+  _UpsampleNearest, export_for_inference, fuse_conv_bn_, quantize
+)
+
+
+def test_rdb_inplace_inference():
+  for m in (Rdb(16, depth=4), CascadeRdn(16, 3, True)):
+    x = torch.rand(2, 16, 12, 12)
+    y1 = m(x)
+    with torch.no_grad():
+      y2 = m(x)
+    assert torch.allclose(y1, y2, rtol=1e-5, atol=1e-6)
+
+
+def test_channels_last():
+  m1 = CascadeRdn(16, 3, True)
+  m2 = CascadeRdn(16, 3, True, memory_format=torch.channels_last)
+  m2.load_state_dict(m1.state_dict())
+  x = torch.rand(2, 16, 12, 12)
+  with torch.no_grad():
+    y1 = m1(x)
+    y2 = m2(x)
+  assert y2.is_contiguous(memory_format=torch.channels_last)
+  assert torch.allclose(y1, y2, rtol=1e-5, atol=1e-6)
+
+
+def test_script():
+  for m in (Rdb(64), CascadeRdn(16, 3, True), CascadeRdn(16, 3, False)):
+    s = torch.jit.script(m)
+    x = torch.rand(2, m.in_c, 12, 12)
+    assert torch.allclose(m(x), s(x), rtol=1e-5, atol=1e-6)
+    with torch.no_grad():
+      assert torch.allclose(m(x), s(x), rtol=1e-5, atol=1e-6)
+
+
+def test_export_for_inference():
+  for m in (Rdb(16), Rcab(16), CascadeRdn(16, 3, True)):
+    m.eval()
+    s = export_for_inference(m)
+    x = torch.rand(1, 16, 20, 16)
+    with torch.no_grad():
+      assert torch.allclose(m(x), s(x), rtol=1e-5, atol=1e-6)
+
+
+def test_rcab_legacy_state_dict():
+  m = Rcab(32)
+  sd = m.state_dict()
+  for old, new in (('c3.0.', 'fc1.'), ('c4.0.', 'fc2.')):
+    sd[old + 'weight'] = sd.pop(new + 'weight')[..., None, None]
+    sd[old + 'bias'] = sd.pop(new + 'bias')
+  m2 = Rcab(32)
+  m2.load_state_dict(sd)
+  x = torch.rand(2, 32, 8, 8)
+  assert torch.allclose(m(x), m2(x))
+
+
+def test_space_to_depth_and_batch():
+  x = torch.rand(2, 3, 8, 12)
+  assert torch.equal(SpaceToDepth(2)(x), SpaceToDim(2, dim=1)(x))
+  y = SpaceToDepth(2, memory_format=torch.channels_last)(x)
+  assert y.is_contiguous(memory_format=torch.channels_last)
+  assert torch.equal(y, SpaceToDim(2, dim=1)(x))
+  assert torch.equal(SpaceToBatch(4)(x), SpaceToDim(4, dim=0)(x))
+
+
+def test_space_to_dim_5d():
+  x = torch.arange(2 * 3 * 4 * 4 * 6).reshape(2, 3, 4, 4, 6)
+  y = SpaceToDim(2, dims=(-2, -1), dim=1)(x)
+  assert y.shape == torch.Size([2, 12, 4, 2, 3])
+  assert y[0, :, 0, 0, 0].tolist() == [
+    0, 1, 6, 7, 96, 97, 102, 103, 192, 193, 198, 199]
+  assert y[1, :, 2, 1, 1].tolist() == [
+    350, 351, 356, 357, 446, 447, 452, 453, 542, 543, 548, 549]
+  y = SpaceToDim(2, dims=(-2, -1), dim=0)(x)
+  assert y.shape == torch.Size([8, 3, 4, 2, 3])
+  assert y[:, 0, 0, 0, 0].tolist() == [0, 1, 6, 7, 288, 289, 294, 295]
+  assert y[:, 1, 2, 1, 1].tolist() == [
+    158, 159, 164, 165, 446, 447, 452, 453]
+  y = SpaceToDim(2, dims=(2, 3), dim=4)(x)
+  assert y.shape == torch.Size([2, 3, 2, 2, 24])
+  assert y[0, 0, 0, 0].tolist() == [
+    0, 12, 6, 18, 24, 36, 30, 42, 1, 13, 7, 19,
+    25, 37, 31, 43, 2, 14, 8, 20, 26, 38, 32, 44]
+  assert y[1, 2, 1, 1].tolist() == [
+    531, 543, 537, 549, 555, 567, 561, 573, 532, 544, 538, 550,
+    556, 568, 562, 574, 533, 545, 539, 551, 557, 569, 563, 575]
+
+
+def test_cascade_rdn_legacy_state_dict():
+  m = CascadeRdn(16, 3, True)
+  sd = {}
+  for k, v in m.state_dict().items():
+    k = k.replace('conv11s.', 'conv11_').replace('rdns.', 'rdn_')
+    k = k.replace('rcabs.', 'rcab_').replace('convs.', 'conv_')
+    sd[k] = v
+  m2 = CascadeRdn(16, 3, True)
+  m2.load_state_dict(sd)
+  x = torch.rand(1, 16, 8, 8)
+  assert torch.allclose(m(x), m2(x))
+
+
+def test_fuse_conv_bn():
+  for bias in (True, False):
+    m = EasyConv2d(8, 16, 3, activation='relu', use_bias=bias, use_bn=True)
+    bn = m.body[1]
+    bn.running_mean.uniform_(-1, 1)
+    bn.running_var.uniform_(0.5, 2)
+    bn.weight.data.uniform_(0.5, 2)
+    bn.bias.data.uniform_(-1, 1)
+    m.eval()
+    x = torch.rand(2, 8, 10, 10)
+    with torch.no_grad():
+      y1 = m(x)
+      fuse_conv_bn_(m)
+      y2 = m(x)
+    assert isinstance(m.body[1], torch.nn.Identity)
+    assert torch.allclose(y1, y2, rtol=1e-5, atol=1e-5)
+
+
+def test_fuse_conv_bn_weight_norm():
+  nn = torch.nn
+  norms = [nn.utils.weight_norm, nn.utils.spectral_norm]
+  if hasattr(nn.utils, 'parametrizations'):
+    norms += [nn.utils.parametrizations.weight_norm,
+              nn.utils.parametrizations.spectral_norm]
+  for norm in norms:
+    m = nn.Sequential(norm(nn.Conv2d(8, 16, 3, 1, 1)), nn.BatchNorm2d(16))
+    m[1].running_mean.uniform_(-1, 1)
+    m[1].running_var.uniform_(0.5, 2)
+    m.eval()
+    x = torch.rand(2, 8, 10, 10)
+    with torch.no_grad():
+      y1 = m(x)
+      fuse_conv_bn_(m)
+      y2 = m(x)
+    assert isinstance(m[1], nn.BatchNorm2d)
+    assert torch.allclose(y1, y2)
+
+
+def test_upsample_nearest():
+  x = torch.rand(2, 3, 5, 7)
+  for scale in (2, 3, 4):
+    y = torch.nn.functional.interpolate(x, scale_factor=scale)
+    assert torch.equal(_UpsampleNearest(scale)(x), y)
+
+
+def test_quantize():
+  for m in (Rdb(16), Rcab(16)):
+    q = quantize(m, [torch.rand(2, 16, 12, 12) for _ in range(4)])
+    x = torch.rand(1, 16, 12, 12)
+    with torch.no_grad():
+      y1 = m(x)
+      y2 = q(x)
+    assert (y1 - y2).abs().mean() < 0.05 * y1.abs().mean()
+
+
+def test_compiled_cascade_rdn():
+  m1 = CascadeRdn(16, 3, True)
+  m2 = CascadeRdn(16, 3, True, compile_backend='eager')
+  m2.load_state_dict(m1.state_dict())
+  x = torch.rand(2, 16, 12, 12)
+  assert torch.allclose(m1(x), m2(x), rtol=1e-5, atol=1e-6)
+  with torch.no_grad():
+    assert torch.allclose(m1(x), m2(x), rtol=1e-5, atol=1e-6)
+  torch.save(m2, io.BytesIO())
+  m3 = copy.deepcopy(m2)
+  assert m3._compiled_forward is None
+  assert torch.allclose(m1(x), m3(x), rtol=1e-5, atol=1e-6)
+
+
+def _has_inductor():
+  try:
+    import torch._inductor
+  except ImportError:
+    return False
+  # inductor generates C++ kernels for CPU
+  return hasattr(torch, 'compile') and \
+         (torch.cuda.is_available() or shutil.which('g++') is not None)
+
+
+@pytest.mark.skipif(not _has_inductor(), reason="requires torch inductor")
+def test_inductor_cascade_rdn():
+  m1 = CascadeRdn(16, 3, True).eval()
+  m2 = CascadeRdn(16, 3, True, compile_backend='inductor').eval()
+  m2.load_state_dict(m1.state_dict())
+  x = torch.rand(2, 16, 12, 12)
+  with torch.no_grad():
+    for _ in range(3):
+      assert torch.allclose(m1(x), m2(x), rtol=1e-4, atol=1e-5)
+
+
+def test_upsample_deconv_to_ps():
+  m = Upsample(8, 4, 'deconv_to_ps')
+  y = m(torch.rand(1, 8, 6, 6))
+  assert y.shape == torch.Size([1, 8, 24, 24])
+  # ICNR initialized sub-pixel conv starts as nearest upsampling
+  y0 = m.body[0][1](m.body[0][0](torch.rand(1, 8, 6, 6)))
+  assert torch.equal(y0, y0[..., ::2, ::2].repeat_interleave(2, -2)
+                     .repeat_interleave(2, -1))
+
+
+def test_fast_conv_opt_out():
+  cudnn = torch.backends.cudnn
+  states = cudnn.benchmark, cudnn.deterministic, Arch._FAST_CONV
+  env = os.environ.get('VSR_DETERMINISTIC')
+  try:
+    cudnn.benchmark = False
+    for value, deterministic in (('1', False), ('0', True)):
+      Arch._FAST_CONV = False
+      os.environ['VSR_DETERMINISTIC'] = value
+      cudnn.deterministic = deterministic
+      Rdb(8)
+      assert not cudnn.benchmark
+    Arch._FAST_CONV = False
+    cudnn.deterministic = False
+    Rdb(8)
+    assert cudnn.benchmark
+  finally:
+    cudnn.benchmark, cudnn.deterministic, Arch._FAST_CONV = states
+    if env is None:
+      os.environ.pop('VSR_DETERMINISTIC', None)
+    else:
+      os.environ['VSR_DETERMINISTIC'] = env
+
+
+if __name__ == '__main__':
+  test_rdb_inplace_inference()
+  test_channels_last()
+  test_script()
+  test_export_for_inference()
+  test_rcab_legacy_state_dict()
+  test_space_to_depth_and_batch()
+  test_space_to_dim_5d()
+  test_cascade_rdn_legacy_state_dict()
+  test_fuse_conv_bn()
+  test_fuse_conv_bn_weight_norm()
+  test_upsample_nearest()
+  test_quantize()
+  test_compiled_cascade_rdn()
+  if _has_inductor():
+    test_inductor_cascade_rdn()
+  test_upsample_deconv_to_ps()
+  test_fast_conv_opt_out()
@@ -0,0 +1,46 @@
+#  Copyright (c) 2017-2020 Wenyi Tang.
+#  Author: Wenyi Tang
+#  Email: wenyitang@outlook.com
+#  Update: 2026 - 10 - 15
+
+import os
+
+if not os.getcwd().endswith('Tests'):
+  os.chdir('Tests')
+import numpy as np
+import pytest
+import torch
+
+from VSR.Backend.Torch.Framework.Trainer import CUDAPrefetcher, to_tensor
+
+
+def test_to_tensor():
+  x = np.random.randint(0, 256, [2, 3, 8, 8]).astype('uint8')
+  y = to_tensor(x)
+  assert y.dtype == torch.float32
+  assert torch.allclose(y, torch.from_numpy(x).float() / 255)
+  # cpu tensors are still normalized
+  assert torch.allclose(to_tensor(torch.from_numpy(x)), y)
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="requires CUDA")
+def test_cuda_prefetcher():
+  packs = [{'hr': np.random.randint(0, 256, [2, 3, 8, 8]).astype('uint8'),
+            'lr': np.random.randint(0, 256, [2, 3, 4, 4]).astype('uint8'),
+            'name': 'x'} for _ in range(3)]
+  expects = [{k: to_tensor(p[k], cuda=True) for k in ('hr', 'lr')}
+             for p in packs]
+  prefetcher = CUDAPrefetcher(iter([dict(p) for p in packs]))
+  for pack, expect in zip(prefetcher, expects):
+    for k in ('hr', 'lr'):
+      assert pack[k].is_cuda
+      assert torch.allclose(to_tensor(pack[k], cuda=True), expect[k])
+    assert pack['name'] == 'x'
+  with pytest.raises(StopIteration):
+    next(prefetcher)
+
+
+if __name__ == '__main__':
+  test_to_tensor()
+  if torch.cuda.is_available():
+    test_cuda_prefetcher()
@@ -47,6 +47,9 @@ def _ensemble_reduce_mean(outputs):
 
 
 def to_tensor(x, cuda=False):
+  if torch.is_tensor(x) and x.is_cuda and x.is_floating_point():
+    # already normalized and copied by `CUDAPrefetcher`
+    return x
   x = torch.as_tensor(x / 255.0, dtype=torch.float32)
   if cuda and torch.cuda.is_available():
     x = x.cuda()
@@ -57,6 +60,54 @@ def from_tensor(x):
   return x * 255
 
 
+class CUDAPrefetcher:
+  """Wrap a batch iterator to copy the next batch to GPU on a side stream,
+  overlapping the host-to-device transfer with the current training step.
+
+  Args:
+    iterator: an iterator yielding packs, i.e. `EpochIterator`.
+    keys: items in each pack to convert as `to_tensor` does.
+  """
+
+  def __init__(self, iterator, keys=('hr', 'lr')):
+    self.iterator = iterator
+    self.keys = keys
+    self.stream = torch.cuda.Stream()
+    self.pack = None
+    self.preload()
+
+  def __len__(self):
+    return len(self.iterator)
+
+  def __iter__(self):
+    return self
+
+  def __next__(self):
+    torch.cuda.current_stream().wait_stream(self.stream)
+    pack = self.pack
+    if pack is None:
+      raise StopIteration
+    for k in self.keys:
+      if torch.is_tensor(pack.get(k)):
+        # tensors are allocated on the side stream but used on current stream
+        pack[k].record_stream(torch.cuda.current_stream())
+    self.preload()
+    return pack
+
+  def preload(self):
+    try:
+      self.pack = next(self.iterator)
+    except StopIteration:
+      self.pack = None
+      return
+    with torch.cuda.stream(self.stream):
+      for k in self.keys:
+        x = self.pack.get(k)
+        if isinstance(x, np.ndarray):
+          x = torch.from_numpy(np.ascontiguousarray(x)).pin_memory()
+          self.pack[k] = x.cuda(non_blocking=True).float() / 255.0
+
+
 class SRTrainer(Env):
   v = Config()
 
@@ -109,6 +160,8 @@ class SRTrainer(Env):
                                                          shuffle=True,
                                                          memory_limit=mem)
       v.train_loader.prefetch(shuffle=True, memory_usage=mem)
+      if v.cuda and torch.cuda.is_available():
+        train_iter = CUDAPrefetcher(train_iter)
       date = time.strftime('%Y-%m-%d %T', time.localtime())
       v.avg_meas = {}
       if v.lr_schedule and callable(v.lr_schedule):
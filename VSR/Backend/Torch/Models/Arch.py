@@ -3,12 +3,182 @@
 #  Email: wenyi.tang@intel.com
 #  Update Date: 2019/4/3 下午5:10
 
+import logging
+import os
+import re
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
 from VSR.Util.Utility import to_list
 
+_logger = logging.getLogger("VSR.Arch")
+_FAST_CONV = False
+_ACTIVATIONS = {
+  'relu': nn.ReLU,
+  'prelu': nn.PReLU,
+  'lrelu': nn.LeakyReLU,
+  'leaky': nn.LeakyReLU,
+  'leakyrelu': nn.LeakyReLU,
+  'tanh': nn.Tanh,
+  'sigmoid': nn.Sigmoid,
+}
+
+
+def enable_fast_conv(matmul=True):
+  """Let cuDNN benchmark conv algorithms for each input shape, and allow
+  TF32 tensor cores for fp32 convolutions on Ampere or newer.
+
+  Args:
+      matmul: also allow TF32 for fp32 matmuls (affects every linear layer).
+  """
+
+  torch.backends.cudnn.benchmark = True
+  if hasattr(torch.backends.cudnn, 'allow_tf32'):
+    torch.backends.cudnn.allow_tf32 = True
+    if matmul:
+      torch.backends.cuda.matmul.allow_tf32 = True
+
+
+def _deterministic():
+  env = os.environ.get('VSR_DETERMINISTIC', '').strip().lower()
+  if env in ('1', 'true', 'yes', 'on'):
+    return True
+  if torch.backends.cudnn.deterministic:
+    return True
+  return hasattr(torch, 'are_deterministic_algorithms_enabled') and \
+         torch.are_deterministic_algorithms_enabled()
+
+
+def _enable_fast_conv_once():
+  # called by conv blocks, set env VSR_DETERMINISTIC=1 or request
+  # deterministic algorithms in torch to opt out
+  global _FAST_CONV
+  if not _FAST_CONV and not _deterministic():
+    enable_fast_conv(matmul=False)
+    _FAST_CONV = True
+
+
+def _new_buffer(x: torch.Tensor, channels: int, channels_last: bool = False):
+  """Allocate an uninitialized NCHW feature buffer like `x` with `channels`."""
+  shape = list(x.shape)
+  shape[1] = channels
+  if not channels_last:
+    return x.new_empty(shape)
+  return torch.empty(shape, dtype=x.dtype, device=x.device,
+                     memory_format=torch.channels_last)
+
+
+def _rename_legacy_keys(state_dict, prefix, pattern, repl):
+  """Rename parameters of checkpoints saved with an older module layout."""
+  for k in [k for k in state_dict if k.startswith(prefix)]:
+    new_k = prefix + re.sub(pattern, repl, k[len(prefix):])
+    if new_k != k:
+      state_dict[new_k] = state_dict.pop(k)
+
+
+def export_for_inference(module, *example_inputs):
+  """Compile `module` to a frozen TorchScript graph for inference.
+
+  Freezing inlines the weights as constants, which lets the JIT fold
+  Conv-BN and fuse Conv-ReLU (e.g. cudnn_convolution_relu) on the way.
+  The returned module no longer tracks updates to `module`'s parameters.
+
+  Args:
+      module: the module to export, it will be set to eval mode.
+      example_inputs: inputs to trace `module` with if it can't be scripted.
+  """
+
+  module.eval()
+  with torch.no_grad():
+    try:
+      script = torch.jit.script(module)
+    except Exception:
+      if not example_inputs:
+        raise
+      script = torch.jit.trace(module, example_inputs)
+    if hasattr(torch.jit, 'freeze'):
+      script = torch.jit.freeze(script)
+    if hasattr(torch.jit, 'optimize_for_inference'):
+      script = torch.jit.optimize_for_inference(script)
+  return script
+
+
+def quantize(module, calibration_data, backend='fbgemm'):
+  """Post-training int8 quantization of `module` with torch FX graph mode.
+
+  Conv-ReLU and Linear-ReLU pairs are fused into single quantized ops.
+
+  Args:
+      module: the float module to quantize, it will be set to eval mode.
+      calibration_data: an iterable of input tensors to observe the
+        activation ranges.
+      backend: 'fbgemm' for x86 (AVX2/AVX512-VNNI) or 'qnnpack' for ARM.
+
+  Return:
+      the quantized `GraphModule`, runs on CPU.
+  """
+
+  try:
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+  except ImportError:
+    raise ImportError("FX quantization requires PyTorch 1.13 or later")
+  torch.backends.quantized.engine = backend
+  module.eval()
+  calibration_data = iter(calibration_data)
+  x = next(calibration_data)
+  prepared = prepare_fx(module, get_default_qconfig_mapping(backend), (x,))
+  with torch.no_grad():
+    prepared(x)
+    for x in calibration_data:
+      prepared(x)
+  return convert_fx(prepared)
+
+
+def _is_reparametrized(conv):
+  # weight/spectral norm (hook or parametrize based) re-computes the weight
+  # on every call, folding BN into it would be silently overwritten
+  if conv._forward_pre_hooks or hasattr(conv, 'weight_orig'):
+    return True
+  parametrize = getattr(nn.utils, 'parametrize', None)
+  return parametrize is not None and parametrize.is_parametrized(conv)
+
+
+def fuse_conv_bn_(module):
+  """Fold every BatchNorm2d that directly follows a Conv2d inside a
+  `nn.Sequential` into that conv, and replace the BN with `nn.Identity`.
+  The fused module computes the same inference outputs with one fewer op.
+
+  Args:
+      module: a module in eval mode, modified in place.
+  """
+
+  assert not module.training, "BN statistics are only frozen in eval mode"
+  for seq in module.modules():
+    if not isinstance(seq, nn.Sequential):
+      continue
+    for i in range(1, len(seq)):
+      conv, bn = seq[i - 1], seq[i]
+      if not isinstance(conv, nn.Conv2d) or \
+          not isinstance(bn, nn.BatchNorm2d) or \
+          not bn.track_running_stats or _is_reparametrized(conv):
+        continue
+      with torch.no_grad():
+        scale = torch.rsqrt(bn.running_var + bn.eps)
+        if bn.affine:
+          scale *= bn.weight
+        bias = conv.bias if conv.bias is not None else \
+          torch.zeros_like(bn.running_mean)
+        bias = (bias - bn.running_mean) * scale
+        if bn.affine:
+          bias += bn.bias
+        conv.weight.mul_(scale.view(-1, 1, 1, 1))
+        conv.bias = nn.Parameter(bias)
+      seq[i] = nn.Identity()
+  return module
+
 
 class EasyConv2d(nn.Module):
   def __init__(self, in_channels, out_channels, kernel_size,
@@ -88,6 +258,7 @@ class RB(nn.Module):
 class Rdb(nn.Module):
   def __init__(self, channels, depth=3, scaling=1.0, name='Rdb', **kwargs):
     super(Rdb, self).__init__()
+    _enable_fast_conv_once()
     self.name = name
     self.depth = depth
     self.scaling = scaling
@@ -99,20 +270,53 @@ class Rdb(nn.Module):
     group = kwargs.get('group', 1)
     bias = kwargs.get('bias', True)
     act = kwargs.get('activation', 'relu')
+    # memory_format=torch.channels_last runs convolutions on NHWC kernels,
+    # kept as a bool since TorchScript can't hold a memory_format attribute
+    self.channels_last = kwargs.get('memory_format') is torch.channels_last
+    self.in_c, self.out_c = in_c, out_c
+    self.convs = nn.ModuleList()
     for i in range(depth):
       conv = nn.Conv2d(
           in_c + out_c * i, out_c, ks, stride, padding, dilation, group, bias)
       if i < depth - 1:  # no activation after last layer
         conv = nn.Sequential(conv, Activation(act))
-      setattr(self, f'conv_{i}', conv)
-
-  def forward(self, inputs):
+      self.convs.append(conv)
+    if self.channels_last:
+      self.to(memory_format=torch.channels_last)
+
+  def forward(self, inputs: torch.Tensor) -> torch.Tensor:
+    if self.channels_last:
+      inputs = inputs.contiguous(memory_format=torch.channels_last)
+    if not torch.is_grad_enabled():
+      return self._forward_inplace(inputs)
     fl = [inputs]
-    for i in range(self.depth):
-      conv = getattr(self, f'conv_{i}')
+    for conv in self.convs:
       fl.append(conv(torch.cat(fl, dim=1)))
     return fl[-1] * self.scaling + inputs
 
+  def _forward_inplace(self, inputs: torch.Tensor) -> torch.Tensor:
+    # Write each feature into its slice of one pre-allocated buffer instead
+    # of re-concatenating all previous features at every step. Inference
+    # only: autograd forbids modifying tensors saved for backward.
+    in_c, out_c = self.in_c, self.out_c
+    buf = _new_buffer(inputs, in_c + out_c * (self.depth - 1),
+                      self.channels_last)
+    buf[:, :in_c].copy_(inputs)
+    c = in_c
+    x = inputs
+    for i, conv in enumerate(self.convs):
+      x = conv(buf[:, :c])
+      if i < self.depth - 1:
+        buf[:, c:c + out_c].copy_(x)
+        c += out_c
+    return x * self.scaling + inputs
+
+  def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+    # convert checkpoints saved with `conv_{i}` attributes
+    _rename_legacy_keys(state_dict, prefix, r'^conv_(\d+)\.', r'convs.\1.')
+    super(Rdb, self)._load_from_state_dict(state_dict, prefix, *args,
+                                           **kwargs)
+
   def extra_repr(self):
     return f"{self.name}: depth={self.depth}, scaling={self.scaling}"
 
@@ -120,6 +324,7 @@ class Rdb(nn.Module):
 class Rcab(nn.Module):
   def __init__(self, channels, ratio=16, name='RCAB', **kwargs):
     super(Rcab, self).__init__()
+    _enable_fast_conv_once()
     self.name = name
     self.ratio = ratio
     in_c, out_c = to_list(channels, 2)
@@ -127,27 +332,39 @@ class Rcab(nn.Module):
     padding = kwargs.get('padding', ks // 2)
     group = kwargs.get('group', 1)
     bias = kwargs.get('bias', True)
+    self.channels_last = kwargs.get('memory_format') is torch.channels_last
     self.c1 = nn.Sequential(
         nn.Conv2d(in_c, out_c, ks, 1, padding, 1, group, bias),
         nn.ReLU(True))
     self.c2 = nn.Conv2d(out_c, out_c, ks, 1, padding, 1, group, bias)
-    self.c3 = nn.Sequential(
-        nn.Conv2d(out_c, out_c // ratio, 1, groups=group, bias=bias),
-        nn.ReLU(True))
-    self.c4 = nn.Sequential(
-        nn.Conv2d(out_c // ratio, in_c, 1, groups=group, bias=bias),
-        nn.Sigmoid())
+    # squeeze-excitation on the pooled [N, C] vector as two GEMMs
+    self.fc1 = nn.Linear(out_c, out_c // ratio, bias=bias)
+    self.fc2 = nn.Linear(out_c // ratio, in_c, bias=bias)
     self.pooling = nn.AdaptiveAvgPool2d(1)
+    if self.channels_last:
+      self.to(memory_format=torch.channels_last)
 
   def forward(self, inputs):
+    if self.channels_last:
+      inputs = inputs.contiguous(memory_format=torch.channels_last)
     x = self.c1(inputs)
     y = self.c2(x)
-    x = self.pooling(y)
-    x = self.c3(x)
-    x = self.c4(x)
-    y = x * y
+    x = self.pooling(y).flatten(1)
+    x = F.relu(self.fc1(x), inplace=True)
+    x = torch.sigmoid(self.fc2(x))
+    y = x[..., None, None] * y
     return inputs + y
 
+  def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+    # convert checkpoints saved with 1x1 conv `c3` and `c4`
+    for old, new in (('c3.0.', 'fc1.'), ('c4.0.', 'fc2.')):
+      for k in ('weight', 'bias'):
+        if prefix + old + k in state_dict:
+          v = state_dict.pop(prefix + old + k)
+          state_dict[prefix + new + k] = v.flatten(1) if k == 'weight' else v
+    super(Rcab, self)._load_from_state_dict(state_dict, prefix, *args,
+                                            **kwargs)
+
   def extra_repr(self):
     return f"{self.name}: ratio={self.ratio}"
 
@@ -159,28 +376,81 @@ class CascadeRdn(nn.Module):
     self.name = name
     self.depth = to_list(depth, 2)
     self.ca = use_ca
+    self.channels_last = kwargs.get('memory_format') is torch.channels_last
+    # i.e. 'inductor', specialize the whole cascade with `torch.compile`
+    self.compile_backend = kwargs.get('compile_backend')
+    self._compiled_forward = None
     in_c, out_c = to_list(channels, 2)
+    self.in_c, self.out_c = in_c, out_c
+    self.conv11s = nn.ModuleList()
+    self.rdns = nn.ModuleList()
+    self.rcabs = nn.ModuleList()
     for i in range(self.depth[0]):
-      setattr(self, f'conv11_{i}', nn.Conv2d(in_c + out_c * (i + 1), out_c, 1))
-      setattr(self, f'rdn_{i}', Rdb(channels, self.depth[1], **kwargs))
+      self.conv11s.append(nn.Conv2d(in_c + out_c * (i + 1), out_c, 1))
+      self.rdns.append(Rdb(channels, self.depth[1], **kwargs))
       if use_ca:
-        setattr(self, f'rcab_{i}', Rcab(channels))
-
-  def forward(self, inputs):
+        self.rcabs.append(
+            Rcab(channels, memory_format=kwargs.get('memory_format')))
+      else:
+        self.rcabs.append(nn.Identity())
+    if self.channels_last:
+      self.to(memory_format=torch.channels_last)
+
+  def forward(self, inputs: torch.Tensor) -> torch.Tensor:
+    if self.compile_backend is None or torch.jit.is_scripting():
+      return self._raw_forward(inputs)
+    return self._compiled(inputs)
+
+  @torch.jit.unused
+  def _compiled(self, inputs: torch.Tensor) -> torch.Tensor:
+    if self._compiled_forward is None:
+      # compiled lazily on first call, and dropped when pickled or copied
+      options = dict(backend=self.compile_backend, dynamic=False)
+      if self.compile_backend == 'inductor':
+        options.update(mode='reduce-overhead')
+      self._compiled_forward = torch.compile(self._raw_forward, **options)
+    return self._compiled_forward(inputs)
+
+  def __getstate__(self):
+    # compiled function is not picklable and is bound to this instance
+    state = self.__dict__.copy()
+    state['_compiled_forward'] = None
+    return state
+
+  def _raw_forward(self, inputs: torch.Tensor) -> torch.Tensor:
+    if self.channels_last:
+      inputs = inputs.contiguous(memory_format=torch.channels_last)
+    if not torch.is_grad_enabled():
+      return self._forward_inplace(inputs)
     fl = [inputs]
     x = inputs
-    for i in range(self.depth[0]):
-      rdn = getattr(self, f'rdn_{i}')
-      x = rdn(x)
-      if self.ca:
-        rcab = getattr(self, f'rcab_{i}')
-        x = rcab(x)
+    for rdn, rcab, c11 in zip(self.rdns, self.rcabs, self.conv11s):
+      x = rcab(rdn(x))
       fl.append(x)
-      c11 = getattr(self, f'conv11_{i}')
       x = c11(torch.cat(fl, dim=1))
 
     return x
 
+  def _forward_inplace(self, inputs: torch.Tensor) -> torch.Tensor:
+    # same as `Rdb._forward_inplace`
+    in_c, out_c = self.in_c, self.out_c
+    buf = _new_buffer(inputs, in_c + out_c * self.depth[0], self.channels_last)
+    buf[:, :in_c].copy_(inputs)
+    c = in_c
+    x = inputs
+    for rdn, rcab, c11 in zip(self.rdns, self.rcabs, self.conv11s):
+      buf[:, c:c + out_c].copy_(rcab(rdn(x)))
+      c += out_c
+      x = c11(buf[:, :c])
+    return x
+
+  def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+    # convert checkpoints saved with `conv11_{i}`, `rdn_{i}`, `rcab_{i}`
+    _rename_legacy_keys(state_dict, prefix, r'^(conv11|rdn|rcab)_(\d+)\.',
+                        r'\1s.\2.')
+    super(CascadeRdn, self)._load_from_state_dict(state_dict, prefix, *args,
+                                                  **kwargs)
+
   def extra_repr(self):
     return f"{self.name}: depth={self.depth}, ca={self.ca}"
 
@@ -189,19 +459,18 @@ class Activation(nn.Module):
   def __init__(self, name, *args, **kwargs):
     super(Activation, self).__init__()
     if name is None:
-      self.f = lambda t: t
+      self.name = None
+      self.f = nn.Identity()
+      return
     self.name = name.lower()
     in_place = kwargs.get('in_place', True)
-    if self.name == 'relu':
-      self.f = nn.ReLU(in_place)
-    elif self.name == 'prelu':
-      self.f = nn.PReLU()
-    elif self.name in ('lrelu', 'leaky', 'leakyrelu'):
-      self.f = nn.LeakyReLU(*args, inplace=in_place)
-    elif self.name == 'tanh':
-      self.f = nn.Tanh()
-    elif self.name == 'sigmoid':
-      self.f = nn.Sigmoid()
+    act = _ACTIVATIONS[self.name]
+    if act is nn.LeakyReLU:
+      self.f = act(*args, inplace=in_place)
+    elif act is nn.ReLU:
+      self.f = act(in_place)
+    else:
+      self.f = act()
 
   def forward(self, x):
     return self.f(x)
@@ -214,6 +483,11 @@ class _UpsampleNearest(nn.Module):
 
   def forward(self, x, scale=None):
     scale = scale or self.scale
+    if isinstance(scale, int) and x.dim() == 4 and x.is_contiguous():
+      # integer nearest upsampling is just repeating pixels
+      n, c, h, w = x.shape
+      x = x[:, :, :, None, :, None].expand(n, c, h, scale, w, scale)
+      return x.reshape(n, c, h * scale, w * scale)
     return F.interpolate(x, scale_factor=scale)
 
 
@@ -232,15 +506,21 @@ class _UpsampleLinear(nn.Module):
 class Upsample(nn.Module):
   def __init__(self, channel, scale, method='ps', name='Upsample', **kwargs):
     super(Upsample, self).__init__()
+    _enable_fast_conv_once()
     self.name = name
     self.channel = channel
     self.scale = scale
     self.method = method.lower()
     self.kernel_size = kwargs.get('kernel_size', 3)
+    self.channels_last = kwargs.get('memory_format') is torch.channels_last
 
-    _allowed_methods = ('ps', 'nearest', 'deconv', 'linear')
+    _allowed_methods = ('ps', 'nearest', 'deconv', 'linear', 'deconv_to_ps')
     assert self.method in _allowed_methods
     act = kwargs.get('activation')
+    if self.method == 'deconv':
+      _logger.warning("Transposed convolution is slower and produces "
+                      "checkerboard artifacts, consider method='ps' or "
+                      "'deconv_to_ps'.")
 
     samplers = []
     while scale > 1:
@@ -251,15 +531,26 @@ class Upsample(nn.Module):
         samplers.append(self.upsampler(self.method, 2, act))
         scale //= 2
     self.body = nn.Sequential(*samplers)
+    if self.channels_last:
+      self.to(memory_format=torch.channels_last)
 
   def upsampler(self, method, scale, activation=None):
     body = []
     k = self.kernel_size
-    if method == 'ps':
+    if method in ('ps', 'deconv_to_ps'):
       p = k // 2  # padding
       s = 1  # strides
       body = [nn.Conv2d(self.channel, self.channel * scale * scale, k, s, p),
               nn.PixelShuffle(scale)]
+      if method == 'deconv_to_ps':
+        # ICNR: start as a conv followed by nearest upsampling, which has
+        # no checkerboard artifacts, like a well initialized deconvolution
+        with torch.no_grad():
+          conv = body[0]
+          conv.weight.copy_(conv.weight[:self.channel].repeat_interleave(
+              scale * scale, dim=0))
+          conv.bias.copy_(conv.bias[:self.channel].repeat_interleave(
+              scale * scale, dim=0))
       if activation:
         body.insert(1, Activation(activation))
     if method == 'deconv':
@@ -278,6 +569,8 @@ class Upsample(nn.Module):
     return nn.Sequential(*body)
 
   def forward(self, inputs):
+    if self.channels_last:
+      inputs = inputs.contiguous(memory_format=torch.channels_last)
     return self.body(inputs)
 
   def extra_repr(self):
@@ -290,31 +583,35 @@ class SpaceToDim(nn.Module):
     self.scale_factor = scale_factor
     self.dims = dims
     self.dim = dim
+    self._plans = {}  # cached (space dims, permutation) by input rank
 
-  def forward(self, x):
-    _shape = list(x.shape)
-    shape = _shape.copy()
-    dims = [x.dim() + self.dims[0] if self.dims[0] < 0 else self.dims[0],
-            x.dim() + self.dims[1] if self.dims[1] < 0 else self.dims[1]]
+  def _make_plan(self, ndim):
+    dims = [ndim + self.dims[0] if self.dims[0] < 0 else self.dims[0],
+            ndim + self.dims[1] if self.dims[1] < 0 else self.dims[1]]
     dims = [max(abs(dims[0]), abs(dims[1])),
             min(abs(dims[0]), abs(dims[1]))]
     if self.dim in dims:
       raise RuntimeError("Integrate dimension can't be space dimension!")
-    shape[dims[0]] //= self.scale_factor
-    shape[dims[1]] //= self.scale_factor
-    shape.insert(dims[0] + 1, self.scale_factor)
-    shape.insert(dims[1] + 1, self.scale_factor)
     dim = self.dim if self.dim < dims[1] else self.dim + 1
     dim = dim if dim <= dims[0] else dim + 1
-    x = x.reshape(*shape)
     perm = [dim, dims[1] + 1, dims[0] + 2]
     perm = [i for i in range(min(perm))] + perm
-    perm.extend((i for i in range(x.dim()) if i not in perm))
+    perm.extend((i for i in range(ndim + 2) if i not in perm))
+    return dims[0], dims[1], tuple(perm)
+
+  def forward(self, x):
+    plan = self._plans.get(x.dim())
+    if plan is None:
+      plan = self._plans[x.dim()] = self._make_plan(x.dim())
+    d0, d1, perm = plan
+    r = self.scale_factor
+    shape = list(x.shape)
+    x = x.reshape(*shape[:d1], shape[d1] // r, r, *shape[d1 + 1:d0],
+                  shape[d0] // r, r, *shape[d0 + 1:])
     x = x.permute(*perm)
-    shape = _shape
-    shape[self.dim] *= self.scale_factor ** 2
-    shape[self.dims[0]] //= self.scale_factor
-    shape[self.dims[1]] //= self.scale_factor
+    shape[self.dim] *= r ** 2
+    shape[d0] //= r
+    shape[d1] //= r
     return x.reshape(*shape)
 
   def extra_repr(self):
@@ -322,11 +619,30 @@ class SpaceToDim(nn.Module):
 
 
 class SpaceToDepth(nn.Module):
-  def __init__(self, block_size):
+  """Move spatial blocks into channels.
+
+  Args:
+    block_size: size of the square block.
+    memory_format: None or torch.channels_last. With channels_last, 4-D
+      outputs are produced in channels_last memory format, so blocks built
+      with the same `memory_format` consume them without re-layout.
+  """
+
+  def __init__(self, block_size, memory_format=None):
     super(SpaceToDepth, self).__init__()
     self.body = SpaceToDim(block_size, dim=1)
+    self.channels_last = memory_format is torch.channels_last
 
   def forward(self, x):
+    if x.dim() == 4 and self.channels_last:
+      n, c, h, w = x.shape
+      r = self.body.scale_factor
+      # gather into [N, H, W, C] order with a single copy
+      x = x.reshape(n, c, h // r, r, w // r, r).permute(0, 2, 4, 1, 3, 5)
+      x = x.reshape(n, h // r, w // r, c * r * r)
+      return x.permute(0, 3, 1, 2)
+    if x.dim() == 4 and hasattr(F, 'pixel_unshuffle'):
+      return F.pixel_unshuffle(x, self.body.scale_factor)
     return self.body(x)
 
 
@@ -336,7 +652,12 @@ class SpaceToBatch(nn.Module):
     self.body = SpaceToDim(block_size, dim=0)
 
   def forward(self, x):
-    return self.body(x)
+    if x.dim() != 4:
+      return self.body(x)
+    n, c, h, w = x.shape
+    r = self.body.scale_factor
+    x = x.view(n, c, h // r, r, w // r, r).permute(0, 3, 5, 1, 2, 4)
+    return x.reshape(n * r * r, c, h // r, w // r)
 
 
 class CBAM(nn.Module):
@@ -14,9 +14,13 @@ from .VirtualFile import ImageFile, RawFile
 from ..Util import Config, to_list
 
 try:
-  from yaml import FullLoader as _Loader
+  # libyaml based loader, much faster on large description files
+  from yaml import CFullLoader as _Loader
 except ImportError:
-  from yaml import Loader as _Loader
+  try:
+    from yaml import FullLoader as _Loader
+  except ImportError:
+    from yaml import Loader as _Loader
 
 IMAGE_SUF = ('PNG', 'JPG', 'JPEG', 'BMP', 'TIFF', 'TIF', 'GIF')
 VIDEO_SUF = {
@@ -28,6 +32,9 @@ VIDEO_SUF = {
   'RGB': 'RGB'
 }
 
+_SPLITS = frozenset(('train', 'val', 'test'))
+_GLOB_MAGIC = re.compile('[*?[]')
+
 
 def _supported_image(x: Path):
   return x.suffix[1:].upper() in IMAGE_SUF
@@ -46,6 +53,9 @@ class Dataset(object):
 
   """
 
+  __slots__ = ('dirs', 'recursive', 'glob_patterns', 'inc_patterns',
+               'exc_patterns', 'as_video', 'compiled')
+
   def __init__(self, *folders):
     self.dirs = list(map(Path, folders))
     self.recursive = True
@@ -121,6 +131,12 @@ class Dataset(object):
         nodes.append(folder)
       fn_glob = Path.rglob if self.recursive else Path.glob
       for pat in self.glob_patterns:
+        if not self.recursive and not _GLOB_MAGIC.search(str(pat)):
+          # a plain path, check it directly rather than scanning the folder
+          node = folder / pat
+          if node.exists():
+            nodes.append(node)
+          continue
         nodes += list(fn_glob(folder, pat))
       if self.inc_patterns:
         nodes = filter(_inc, nodes)
@@ -200,29 +216,20 @@ def load_datasets(describe_file, key=''):
   """load dataset described in YAML file"""
 
   def _extend_pattern(url):
-    _url = root / Path(url)
-    url_p = _url
-
-    while True:
+    # a folder is extended to all files inside it, others are glob patterns
+    if url not in extended:
       try:
-        if url_p.exists():
-          break
+        is_dir = (root / url).is_dir()
       except OSError:
-        url_p = url_p.parent
-        continue
-      if url_p == url_p.parent:
-        break
-      url_p = url_p.parent
-    # retrieve glob pattern
-    url_r = str(_url.relative_to(url_p))
-    if url_r == '.' and url_p.is_dir():
-      return str(Path(url) / '**/*')
-    return url
+        # not a valid path (i.e. wildcards on Windows)
+        is_dir = False
+      extended[url] = str(Path(url) / '**/*') if is_dir else url
+    return extended[url]
 
   def _get_dataset(desc, use_as_video=None, name=None):
     dataset = Config(name=name)
     for i in desc:
-      if i not in ('train', 'val', 'test'):
+      if i not in _SPLITS:
         continue
       if isinstance(desc[i], dict):
         hr = to_list(desc[i].get('hr'))
@@ -254,6 +261,7 @@ def load_datasets(describe_file, key=''):
     return dataset
 
   datasets = Config()
+  extended = {}  # same paths are shared by many datasets, check them once
   with open(describe_file, 'r') as fd:
     config = yaml.load(fd, Loader=_Loader)
     root = Path(config["Root"])